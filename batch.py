@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import re
+
+import pandas as pd
+
+from evaluate import (
+    PROMPT_FILE, RESULTS_FILE, RESULTS_DIR, append_rows, build_row, load_prompts, load_targets, partition_file,
+    record_metrics, safe_name, save_metrics,
+)
+from metrics import MetricsStore, SKETCH_FILE
+
+BATCH_DIR = 'Downloadfile/batch'
+BATCH_ENDPOINT = '/v1/chat/completions'
+# OpenAI Batch API 입력 파일 제한 (요청 50,000개, 200MB)
+MAX_LINES = 50000
+MAX_BYTES = 200 * 1024 * 1024
+CHUNK_SIZE = 1000
+
+
+def make_custom_id(target, no):
+    # 같은 코퍼스/타겟이면 실행할 때마다 같은 ID가 나오도록 프롬프트 번호로만 구성
+    return f"{target['name']}__{no}"
+
+
+def parse_custom_id(custom_id):
+    target_name, no = custom_id.rsplit('__', 1)
+    return target_name, int(no)
+
+
+class ShardWriter:
+    # 줄 수/바이트 제한을 넘기 전에 다음 샤드 파일로 넘어가며 JSONL을 기록
+    def __init__(self, out_dir, prefix, max_lines=MAX_LINES, max_bytes=MAX_BYTES):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.filenames = []
+        self.file = None
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self, record):
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        if self.file is None or self.lines >= self.max_lines or self.bytes + len(line) > self.max_bytes:
+            self.open_next()
+        self.file.write(line)
+        self.lines += 1
+        self.bytes += len(line)
+
+    def remove_stale(self):
+        # 이전 빌드의 샤드가 남아 있으면 새 샤드 수가 줄었을 때 함께 업로드될 수 있으므로 먼저 지움
+        # (접두사가 다른 타겟의 샤드는 건드리지 않도록 번호까지 정확히 맞는 파일만)
+        pattern = re.compile(re.escape(self.prefix) + r'-\d{5}\.jsonl')
+        for name in os.listdir(self.out_dir):
+            if pattern.fullmatch(name):
+                os.remove(os.path.join(self.out_dir, name))
+
+    def open_next(self):
+        self.close()
+        filename = os.path.join(self.out_dir, f"{self.prefix}-{len(self.filenames):05d}.jsonl")
+        self.file = open(filename, 'wb')
+        self.filenames.append(filename)
+        self.lines = 0
+        self.bytes = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def build_batch(targets, prompts_file=PROMPT_FILE, out_dir=BATCH_DIR, max_lines=MAX_LINES, max_bytes=MAX_BYTES):
+    # Batch API 입력 파일에는 한 모델의 요청만 담을 수 있으므로 타겟마다 샤드를 따로 만든다.
+    os.makedirs(out_dir, exist_ok=True)
+    writers = {target['name']: ShardWriter(out_dir, safe_name(target['name']), max_lines, max_bytes) for target in targets}
+    for writer in writers.values():
+        writer.remove_stale()
+    try:
+        # 요청 본문에는 type이 들어가지 않으므로 type 없이 읽음
+        for row in load_prompts(prompts_file, untyped=True).itertuples(index=False):
+            for target in targets:
+                writers[target['name']].write({
+                    'custom_id': make_custom_id(target, row.no),
+                    'method': 'POST',
+                    'url': BATCH_ENDPOINT,
+                    'body': {
+                        'model': target['model'],
+                        'messages': [{'role': 'user', 'content': row.prompt}],
+                    },
+                })
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {target_name: writer.filenames for target_name, writer in writers.items()}
+
+
+def read_batch_output(filename):
+    # 출력 파일을 한 줄씩 읽으므로 파일 크기와 무관하게 메모리 사용량이 일정함
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_ingested_keys(filename):
+    # 이미 적재된 (target, no, run_id) 조합. 필요한 세 열만 읽음
+    # 숫자로 된 타겟 이름/run_id도 그대로 비교되도록 모두 문자열로 읽고, 적재 쪽 키도 문자열로 만듦
+    if not os.path.exists(filename):
+        return set()
+    columns = {'target', 'no', 'run_id'}
+    existing_df = pd.read_csv(filename, usecols=lambda column: column in columns, dtype=str)
+    if set(existing_df.columns) != columns:
+        return set()
+    return set(zip(existing_df['target'], existing_df['no'], existing_df['run_id']))
+
+
+def parse_result(record):
+    # 형식이 맞지 않는 레코드는 None을 돌려주어 실패로 집계
+    response = record.get('response') or {}
+    if record.get('error') or response.get('status_code') != 200:
+        return None
+    try:
+        body = response['body']
+        usage = body.get('usage') or {}
+        content = body['choices'][0]['message'].get('content') or ''
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None
+    return {
+        'response': content,
+        'latency': None,
+        'ttft': None,
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'completion_tokens': usage.get('completion_tokens'),
+    }
+
+
+def ingest_batch(output_files, targets, prompts_file=PROMPT_FILE, run_id=None, results_file=RESULTS_FILE,
+                 results_dir=None, sketch_file=SKETCH_FILE, types_file=None, untyped=False):
+    # results_dir를 지정하면 팬아웃과 같은 타겟별 파티션에, 아니면 results_file에 이어 씀
+    # run_id를 주지 않으면 출력 파일 이름으로 정하므로, 같은 파일을 다시 적재해도 이미 있는 행은 건너뜀
+    targets_by_name = {target['name']: target for target in targets}
+    prompts = {row.no: row for row in load_prompts(prompts_file, types_file, untyped).itertuples(index=False)}
+    store = MetricsStore()
+    pending = {}
+    ingested = {}
+    written = 0
+    skipped = 0
+    failed = 0
+
+    def flush(filename):
+        nonlocal written
+        rows = pending.pop(filename, [])
+        append_rows(filename, rows)
+        written += len(rows)
+
+    if results_dir:
+        os.makedirs(results_dir, exist_ok=True)
+    try:
+        for output_file in output_files:
+            file_run_id = run_id or 'batch-' + os.path.splitext(os.path.basename(output_file))[0]
+            for record in read_batch_output(output_file):
+                try:
+                    target_name, no = parse_custom_id(record['custom_id'])
+                except (KeyError, ValueError, AttributeError):
+                    failed += 1
+                    continue
+                result = parse_result(record)
+                if result is None or target_name not in targets_by_name or no not in prompts:
+                    failed += 1
+                    continue
+                filename = partition_file(target_name, results_dir) if results_dir else results_file
+                if filename not in ingested:
+                    ingested[filename] = load_ingested_keys(filename)
+                key = (target_name, str(no), file_run_id)
+                if key in ingested[filename]:
+                    skipped += 1
+                    continue
+                ingested[filename].add(key)
+                target = targets_by_name[target_name]
+                record_metrics(store, target, prompts[no], file_run_id, result)
+                pending.setdefault(filename, []).append(build_row(target, prompts[no], file_run_id, result))
+                if len(pending[filename]) >= CHUNK_SIZE:
+                    flush(filename)
+                    save_metrics(store, sketch_file)
+                    store = MetricsStore()
+    finally:
+        for filename in list(pending):
+            flush(filename)
+        save_metrics(store, sketch_file)
+    return written, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch API 요청 파일 생성 및 결과 적재')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='jailbreakPrompt.csv를 Batch API 요청 JSONL 샤드로 변환')
+    build_parser.add_argument('--out-dir', default=BATCH_DIR)
+    build_parser.add_argument('--max-lines', type=int, default=MAX_LINES)
+    build_parser.add_argument('--max-bytes', type=int, default=MAX_BYTES)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Batch API 출력 JSONL을 결과 파일에 적재')
+    ingest_parser.add_argument('outputs', nargs='+', help='Batch API 출력 JSONL 파일')
+    ingest_parser.add_argument('--run-id', help='결과 run_id (기본값: batch-<출력 파일 이름>)')
+    ingest_parser.add_argument('--partitioned', action='store_true', help=f"결과를 {RESULTS_DIR}의 타겟별 파티션에 기록")
+    ingest_parser.add_argument('--types-file', help=f"프롬프트 type을 가져올 no,type 파일 (기본값: {RESULTS_FILE})")
+    ingest_parser.add_argument('--untyped', action='store_true', help="type이 없는 프롬프트를 'unknown'으로 적재")
+
+    for subparser in (build_parser, ingest_parser):
+        subparser.add_argument('--targets', help='타겟 목록 JSON 파일 (evaluate.py와 동일한 형식)')
+        subparser.add_argument('--name', help='타겟 이름 (기본값: 모델 이름)')
+        subparser.add_argument('--model')
+        subparser.add_argument('--prompts', default=PROMPT_FILE)
+    args = parser.parse_args()
+
+    if args.targets:
+        targets = load_targets(args.targets)
+    elif args.model:
+        targets = [{'name': args.name or args.model, 'model': args.model}]
+    else:
+        parser.error('--targets 또는 --model 을 지정해야 합니다.')
+
+    if args.command == 'build':
+        shards = build_batch(targets, args.prompts, args.out_dir, max_lines=args.max_lines, max_bytes=args.max_bytes)
+        for target_name, filenames in shards.items():
+            for filename in filenames:
+                print(filename)
+            print(f"[{target_name}] {len(filenames)}개 샤드 생성 완료")
+    else:
+        results_dir = RESULTS_DIR if args.partitioned else None
+        written, skipped, failed = ingest_batch(
+            args.outputs, targets, args.prompts, run_id=args.run_id, results_dir=results_dir,
+            types_file=args.types_file, untyped=args.untyped,
+        )
+        print(f"{written}개 결과 적재 완료, {skipped}개 중복 건너뜀, {failed}개 실패")
+
+
+if __name__ == "__main__":
+    main()
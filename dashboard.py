@@ -3,19 +3,57 @@ import streamlit as st
 import time
 import os
 
+from evaluate import RESULTS_DIR
+from metrics import MetricsStore, SKETCH_FILE
+
 # 독립적인 함수로 분리하여 캐시 처리
 @st.cache_data
 def load_results(filename):
     return pd.read_csv(filename)
 
-def calculate_success_rate(results_df):
-    grouped = results_df.groupby(['type']).agg(
+@st.cache_data
+def load_partitions(results_dir):
+    # 팬아웃 평가가 남긴 타겟별 결과 파티션을 하나로 합침
+    if not os.path.isdir(results_dir):
+        return pd.DataFrame()
+    frames = [
+        pd.read_csv(os.path.join(results_dir, name))
+        for name in sorted(os.listdir(results_dir)) if name.endswith('.csv')
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def load_metrics(filename):
+    # 스케치 파일은 작으므로 캐시 없이 매번 읽어 최신 실행 결과를 반영
+    return MetricsStore.load(filename)
+
+def calculate_success_rate(results_df, group_by=('type',)):
+    # 성공률은 0~1 비율로 돌려주고, 백분율 변환은 차트를 그릴 때 한 곳에서만 함
+    grouped = results_df.groupby(list(group_by)).agg(
         success_count=('탈옥성공여부', lambda x: (x == 'success').sum()),
         total_count=('탈옥성공여부', 'count')
     ).reset_index()
     grouped['success_rate'] = grouped['success_count'] / grouped['total_count']
     return grouped
 
+def to_percent(grouped_df):
+    return grouped_df.assign(success_rate=grouped_df['success_rate'] * 100)
+
+CHART_COLORS = ['#004457', '#007475', '#00C6B4', '#1EA47D', '#8BD276', '#F9F871']
+
+def chart_spec(df, mark, encoding, color_field):
+    # 모든 차트가 같은 팔레트를 쓰도록 색상 인코딩과 데이터를 채워 vega-lite 스펙을 만듦
+    encoding = dict(encoding, color={'field': color_field, 'type': 'nominal', 'scale': {'range': CHART_COLORS}})
+    return {'mark': mark, 'encoding': encoding, 'data': {'values': df.to_dict(orient='records')}}
+
+def grouped_bar_spec(df, y_field, y_title, tooltip):
+    # 유형별로 타겟 막대를 나란히 놓는 비교 차트
+    return chart_spec(df, 'bar', {
+        'x': {'field': 'type', 'type': 'nominal', 'axis': {'title': 'Type', 'labelAngle': 0}},
+        'xOffset': {'field': 'target', 'type': 'nominal'},
+        'y': {'field': y_field, 'type': 'quantitative', 'axis': {'title': y_title}},
+        'tooltip': [{'field': 'target', 'type': 'nominal'}, {'field': 'type', 'type': 'nominal'}] + tooltip,
+    }, 'target')
+
 class DashboardApp:
     def __init__(self):
         self.session_state = None
@@ -144,21 +182,10 @@ class DashboardApp:
                     st.markdown("<div class='chart-title'>질문 유형별 데이터 비율</div>", unsafe_allow_html=True)
                     st.markdown("<br><br>", unsafe_allow_html=True)
                     if not grouped_df.empty:
-                        pie_chart = {
-                            'mark': {'type': 'arc', 'innerRadius': 50},
-                            'encoding': {
-                                'theta': {'field': 'total_count', 'type': 'quantitative'},
-                                'color': {
-                                    'field': 'type',
-                                    'type': 'nominal',
-                                    'scale': {
-                                        'range': ['#004457', '#007475', '#00C6B4', '#1EA47D', '#8BD276', '#F9F871']
-                                    }
-                                },
-                                'tooltip': [{'field': 'type', 'type': 'nominal'}, {'field': 'total_count', 'type': 'quantitative'}]
-                            },
-                            'data': {'values': grouped_df.to_dict(orient='records')}
-                        }
+                        pie_chart = chart_spec(grouped_df, {'type': 'arc', 'innerRadius': 50}, {
+                            'theta': {'field': 'total_count', 'type': 'quantitative'},
+                            'tooltip': [{'field': 'type', 'type': 'nominal'}, {'field': 'total_count', 'type': 'quantitative'}]
+                        }, 'type')
                         st.vega_lite_chart(pie_chart, use_container_width=True)
 
             with col2:
@@ -167,25 +194,53 @@ class DashboardApp:
                     st.markdown("<div class='chart-title'>질문 유형별 탈옥 성공 비율</div>", unsafe_allow_html=True)
                     st.markdown("<br><br>", unsafe_allow_html=True)
                     if not grouped_df.empty:
-                        grouped_df['success_rate'] *= 100  # Convert to percentage
-                        bar_chart = {
-                            'mark': 'bar',
-                            'encoding': {
-                                'x': {'field': 'type', 'type': 'nominal', 'axis': {'title': 'Type', 'labelAngle': 0}},
-                                'y': {'field': 'success_rate', 'type': 'quantitative', 'axis': {'title': 'Success Rate (%)'}, 'format': '.1f'},
-                                'color': {
-                                    'field': 'type',
-                                    'type': 'nominal',
-                                    'scale': {
-                                        'range': ['#004457', '#007475', '#00C6B4', '#1EA47D', '#8BD276', '#F9F871']
-                                    }
-                                },
-                                'tooltip': [{'field': 'type', 'type': 'nominal'}, {'field': 'success_rate', 'type': 'quantitative', 'format': '.1f'}]
-                            },
-                            'data': {'values': grouped_df.to_dict(orient='records')}
-                        }
+                        bar_chart = chart_spec(to_percent(grouped_df), 'bar', {
+                            'x': {'field': 'type', 'type': 'nominal', 'axis': {'title': 'Type', 'labelAngle': 0}},
+                            'y': {'field': 'success_rate', 'type': 'quantitative', 'axis': {'title': 'Success Rate (%)'}, 'format': '.1f'},
+                            'tooltip': [{'field': 'type', 'type': 'nominal'}, {'field': 'success_rate', 'type': 'quantitative', 'format': '.1f'}]
+                        }, 'type')
                         st.vega_lite_chart(bar_chart, use_container_width=True)
 
+            partitions_df = load_partitions(RESULTS_DIR)
+            if not partitions_df.empty:
+                st.markdown("<hr>", unsafe_allow_html=True)
+                with st.container(border=True):
+                    st.markdown("<div class='chart-title'>타겟별 탈옥 성공 비율 비교</div>", unsafe_allow_html=True)
+                    target_df = calculate_success_rate(partitions_df, group_by=('target', 'type'))
+                    compare_chart = grouped_bar_spec(to_percent(target_df), 'success_rate', 'Success Rate (%)', [
+                        {'field': 'success_rate', 'type': 'quantitative', 'format': '.1f'},
+                        {'field': 'total_count', 'type': 'quantitative'}
+                    ])
+                    st.vega_lite_chart(compare_chart, use_container_width=True)
+
+            store = load_metrics(SKETCH_FILE)
+            if store.sketches:
+                st.markdown("<hr>", unsafe_allow_html=True)
+                with st.container(border=True):
+                    st.markdown("<div class='chart-title'>타겟별 지연시간 / 토큰 사용량</div>", unsafe_allow_html=True)
+                    targets = sorted({target for target, _, _ in store.sketches})
+                    selected_targets = st.multiselect("타겟 선택", targets, default=targets)
+                    metrics_df = pd.DataFrame(store.summary(group_by=('target', 'type')))
+                    metrics_df = metrics_df[metrics_df['target'].isin(selected_targets)]
+                    if metrics_df.empty:
+                        st.warning("No data available to display.")
+                    else:
+                        target_summary_df = pd.DataFrame(store.summary(group_by=('target',)))
+                        target_summary_df = target_summary_df[target_summary_df['target'].isin(selected_targets)]
+                        st.dataframe(target_summary_df[[
+                            'target', 'count',
+                            'latency_p50', 'latency_p95', 'latency_p99',
+                            'ttft_p50', 'ttft_p95', 'ttft_p99',
+                            'prompt_tokens_sum', 'completion_tokens_sum',
+                        ]], use_container_width=True)
+
+                        latency_chart = grouped_bar_spec(metrics_df, 'latency_p95', 'Latency p95 (s)', [
+                            {'field': 'latency_p50', 'type': 'quantitative', 'format': '.2f'},
+                            {'field': 'latency_p95', 'type': 'quantitative', 'format': '.2f'},
+                            {'field': 'latency_p99', 'type': 'quantitative', 'format': '.2f'}
+                        ])
+                        st.vega_lite_chart(latency_chart, use_container_width=True)
+
 if __name__ == "__main__":
     app = DashboardApp()
     app.run()
@@ -0,0 +1,17 @@
+import streamlit as st
+
+from guideline_index import GuidelineIndex
+
+# owasp, prompt_history 페이지가 함께 쓰는 가이드라인 색인 캐시
+# (guideline_index.py는 streamlit 없이 색인을 빌드할 수 있도록 여기서 분리)
+
+# 사전 빌드된 색인만 읽으므로 요청 시점에 PDF를 파싱하지 않음
+@st.cache_resource
+def load_guideline_index(index_dir):
+    return GuidelineIndex.load(index_dir)
+
+# 연결이 미리 계산되지 않은 type은 색인 검색으로 대신하되, 리런마다 다시 검색하지 않도록 type별로 캐시
+@st.cache_data
+def load_type_sections(index_dir, jb_type):
+    index = load_guideline_index(index_dir)
+    return index.sections_for_type(jb_type) if index is not None else []
@@ -0,0 +1,270 @@
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+GUIDELINE_DIR = 'Downloadfile'
+INDEX_DIR = 'Downloadfile/guideline_index'
+META_FILE = 'index.json'
+POSTINGS_FILE = 'postings.bin'
+TYPE_LINKS_FILE = 'type_links.json'
+
+MAX_CHUNK_CHARS = 1500
+TYPE_LINK_COUNT = 3
+
+# "1 개요", "1.1 초거대 AI", "4.1. 개요", "3.Terms", "제2장 ..." 형태의 번호 매긴 제목 줄
+# 번호 앞에 머리말의 쪽 번호가 붙어 "51.2디지털..."처럼 추출되는 경우가 있어 첫 번호는 네 자리까지 받음
+HEADING_RE = re.compile(r'^(제\s*\d{1,2}\s*[장절]|\d{1,4}(?:\.\d{1,2}){0,3}\.?)\s*([^\W\d_].{0,60}(?<![.,;]))$')
+# 목차 줄(점선 리더, 제목 뒤의 쪽 번호)은 제목으로 보지 않음
+TOC_RE = re.compile(r'(\.{3,}|·{3,}|…|\t|\s\d{1,3}$)')
+# 그림/표 캡션, 여러 제목이 한 줄로 붙어 추출된 목차·구성도 줄, 천 단위 숫자가 든 표의 행
+CAPTION_RE = re.compile(r'^(그림|표|Figure|Table)\s*[A-Z]?\d')
+EMBEDDED_NUMBER_RE = re.compile(r'(^|\D)\d{1,2}\.(\d|\s)|\d,\d{3}')
+# 번호 없는 영문 제목 ("Executive summary", "Who is This For?")
+UNNUMBERED_HEADING_RE = re.compile(r'^[A-Z][\x20-\x7e]{2,79}(?<![.,:;])$')
+SENTENCE_END_RE = re.compile(r'[.!?]$')
+MAX_CHAPTER_TITLE_CHARS = 30
+MAX_HEADING_WORDS = 12
+TOKEN_RE = re.compile(r'[가-힣]+|[a-z0-9]+')
+# 띄어쓰기가 사라진 채 추출된 영문 (예: 'Introductionoflargelanguagemodel')
+RUN_ON_RE = re.compile(r'[A-Za-z]{25,}')
+
+
+def tokenize(text):
+    # 한글은 띄어쓰기/조사가 불규칙하므로 음절 bigram, 영문/숫자는 단어 단위로 색인
+    tokens = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if '가' <= word[0] <= '힣' and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def match_heading(line, chapter):
+    # 번호 매긴 제목이면 (번호, 제목)을, 아니면 None을 돌려줌. chapter는 지금까지 나온 가장 큰 장(번호 하나짜리 제목) 번호
+    match = HEADING_RE.match(line)
+    if not match or TOC_RE.search(line):
+        return None
+    number, title = match.groups()
+    if CAPTION_RE.match(title) or EMBEDDED_NUMBER_RE.search(title):
+        return None
+    if number.startswith('제'):
+        return number, title
+    parts = number.rstrip('.').split('.')
+    if any(len(part) > 1 and part.startswith('0') for part in parts[1:]):
+        # "2.05"처럼 0으로 시작하는 하위 번호는 표 안의 소수
+        return None
+    if len(parts) == 1 and not number.endswith('.'):
+        # 점 없는 "1 개요"는 본문의 쪽 번호/목록 번호와 구분되지 않으므로 다음 장 번호이고 제목이 짧을 때만 인정
+        if int(parts[0]) != chapter + 1 or len(title) > MAX_CHAPTER_TITLE_CHARS:
+            return None
+        return number, title
+    # 쪽 번호가 붙은 번호("51.2", "122.")는 앞자리를 떼어 다음 장 번호 이하가 되는 번호로 복원
+    candidates = [parts[0][i:] for i in range(len(parts[0])) if not parts[0][i:].startswith('0')]
+    top = next((candidate for candidate in candidates if int(candidate) <= chapter + 1), None)
+    if top is None:
+        return None
+    return '.'.join([top] + parts[1:]) + ('.' if number.endswith('.') else ''), title
+
+
+def split_sections(pages, document=''):
+    # 제목 줄을 기준으로 섹션을 나누고, 너무 긴 섹션은 MAX_CHUNK_CHARS 단위로 다시 자름
+    # 각 조각의 쪽 번호는 그 조각의 첫 줄이 있는 쪽으로 기록
+    sections = []
+    title = None
+    lines = []
+    chapter = 0
+
+    def flush():
+        chunk = []
+        size = 0
+        for page_no, line in lines + [(None, None)]:
+            if chunk and (line is None or size + len(line) > MAX_CHUNK_CHARS):
+                sections.append({'section': title, 'page': chunk[0][0], 'text': '\n'.join(text for _, text in chunk)})
+                chunk = []
+                size = 0
+            if line is not None:
+                chunk.append((page_no, line))
+                size += len(line) + 1
+
+    for page_no, page_text in enumerate(pages, start=1):
+        # 쪽이 바뀐 직후나 문장이 끝난 직후의 줄만 번호 없는 제목 후보가 되고,
+        # 다음 줄이 소문자로 이어지면 줄바꿈된 문장이므로 제외
+        boundary = True
+        page_lines = [line.strip() for line in page_text.splitlines() if line.strip()]
+        for i, line in enumerate(page_lines):
+            next_line = page_lines[i + 1] if i + 1 < len(page_lines) else ''
+            candidate = line
+            if document and document in line:
+                # 문서 제목으로 된 머리말/꼬리말은 떼어 내고, 머리말에 붙어 추출된 제목만 남김
+                before, _, after = line.rpartition(document)
+                candidate = (after or before).strip()
+            heading = match_heading(candidate, chapter)
+            if heading:
+                number, heading_title = heading
+                if number[0].isdigit() and '.' not in number.rstrip('.'):
+                    chapter = max(chapter, int(number.rstrip('.')))
+                heading = f"{number} {heading_title}"
+            elif (boundary and candidate == line and UNNUMBERED_HEADING_RE.match(line)
+                  and len(line.split()) <= MAX_HEADING_WORDS and not CAPTION_RE.match(line)
+                  and not next_line[:1].islower()):
+                heading = line
+            if heading:
+                flush()
+                title = heading
+                lines = []
+            lines.append((page_no, line))
+            # 제목 바로 다음 줄은 후보에서 빼서 표의 행이나 명단이 줄줄이 제목이 되지 않게 함
+            boundary = bool(SENTENCE_END_RE.search(line) or not any(c.isalpha() for c in candidate))
+    flush()
+    return sections
+
+
+def extract_pages(filename):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise SystemExit("가이드라인 색인을 만들려면 pypdf가 필요합니다: pip install pypdf")
+    reader = PdfReader(filename)
+    pages = []
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        if len(RUN_ON_RE.findall(text)) >= 3:
+            # 글자 간격으로만 띄어쓰기를 표현한 PDF는 layout 모드로 다시 추출하고 정렬용 공백을 합침
+            layout_text = page.extract_text(extraction_mode='layout') or ''
+            text = '\n'.join(re.sub(r' {2,}', ' ', line) for line in layout_text.splitlines())
+        # 합자(ﬁ 등)를 풀고, 추출 과정에서 생긴 짝 없는 서러게이트 문자는 버림
+        text = unicodedata.normalize('NFKC', text)
+        pages.append(text.encode('utf-8', 'ignore').decode('utf-8'))
+    return pages
+
+
+class GuidelineIndex:
+    # 사전 빌드된 역색인을 읽어 BM25로 검색
+    # 포스팅 목록은 memmap으로 열기 때문에 질의에 등장한 용어의 구간만 디스크에서 읽는다.
+    def __init__(self, meta, postings, type_links):
+        self.terms = meta['terms']
+        self.chunks = meta['chunks']
+        self.avg_length = meta['avg_length']
+        self.postings = postings
+        self.type_links = type_links
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR):
+        meta_file = os.path.join(index_dir, META_FILE)
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file, encoding='utf-8') as f:
+            meta = json.load(f)
+        postings = np.memmap(os.path.join(index_dir, POSTINGS_FILE), dtype='<i4', mode='r').reshape(-1, 2)
+        type_links = {}
+        type_links_file = os.path.join(index_dir, TYPE_LINKS_FILE)
+        if os.path.exists(type_links_file):
+            with open(type_links_file, encoding='utf-8') as f:
+                type_links = json.load(f)
+        return cls(meta, postings, type_links)
+
+    def search(self, query, limit=10, k1=1.2, b=0.75):
+        scores = Counter()
+        num_chunks = len(self.chunks)
+        for term in set(tokenize(query)):
+            if term not in self.terms:
+                continue
+            offset, count = self.terms[term]
+            idf = math.log(1 + (num_chunks - count + 0.5) / (count + 0.5))
+            for chunk_id, tf in self.postings[offset:offset + count]:
+                length = self.chunks[chunk_id]['length']
+                scores[int(chunk_id)] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / self.avg_length))
+        return [dict(self.chunks[chunk_id], score=score) for chunk_id, score in scores.most_common(limit)]
+
+    def sections_for_type(self, jb_type):
+        # 빌드 후 새로 생긴 type은 미리 계산된 연결이 없으므로 색인 검색으로 대신함 (PDF는 읽지 않음)
+        if jb_type not in self.type_links:
+            return self.search(jb_type, limit=TYPE_LINK_COUNT)
+        return [self.chunks[chunk_id] for chunk_id in self.type_links[jb_type]]
+
+
+def build_index(guideline_dir=GUIDELINE_DIR, index_dir=INDEX_DIR):
+    chunks = []
+    for filename in sorted(glob.glob(os.path.join(guideline_dir, '*.pdf'))):
+        document = os.path.splitext(os.path.basename(filename))[0]
+        for section in split_sections(extract_pages(filename), document):
+            chunks.append(dict(section, document=document, file=filename))
+        print(f"{document}: 누적 {len(chunks)}개 섹션")
+
+    postings_by_term = {}
+    for chunk_id, chunk in enumerate(chunks):
+        chunk['id'] = chunk_id
+        counts = Counter(tokenize(f"{chunk['section'] or ''}\n{chunk['text']}"))
+        chunk['length'] = sum(counts.values())
+        for term, tf in counts.items():
+            postings_by_term.setdefault(term, []).append((chunk_id, tf))
+
+    # 용어별 포스팅을 하나의 int32 (chunk_id, tf) 배열에 이어 붙이고 용어 사전에는 구간만 기록
+    terms = {}
+    postings = []
+    for term in sorted(postings_by_term):
+        terms[term] = [len(postings), len(postings_by_term[term])]
+        postings.extend(postings_by_term[term])
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.asarray(postings, dtype='<i4').reshape(-1, 2).tofile(os.path.join(index_dir, POSTINGS_FILE))
+    meta = {
+        'terms': terms,
+        'chunks': chunks,
+        'avg_length': sum(chunk['length'] for chunk in chunks) / max(len(chunks), 1),
+    }
+    with open(os.path.join(index_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return GuidelineIndex.load(index_dir)
+
+
+def build_type_links(index, types, index_dir=INDEX_DIR):
+    # 결과에 등장하는 탈옥 type마다 관련도가 높은 섹션을 미리 계산해 둠
+    type_links = {jb_type: [hit['id'] for hit in index.search(jb_type, limit=TYPE_LINK_COUNT)] for jb_type in types}
+    with open(os.path.join(index_dir, TYPE_LINKS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(type_links, f, ensure_ascii=False)
+    index.type_links = type_links
+    return type_links
+
+
+def load_result_types():
+    import pandas as pd
+    from evaluate import RESULTS_DIR, RESULTS_FILE
+
+    filenames = [RESULTS_FILE] + sorted(glob.glob(os.path.join(RESULTS_DIR, '*.csv')))
+    types = set()
+    for filename in filenames:
+        if os.path.exists(filename):
+            types.update(pd.read_csv(filename, usecols=['type'])['type'].dropna().astype(str))
+    return sorted(types)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='참고 가이드라인 PDF 검색 색인 빌드')
+    parser.add_argument('--guideline-dir', default=GUIDELINE_DIR)
+    parser.add_argument('--index-dir', default=INDEX_DIR)
+    parser.add_argument('--types', nargs='*', help='섹션을 연결할 탈옥 type 목록 (기본값: 결과 파일의 type)')
+    parser.add_argument('--links-only', action='store_true', help='PDF를 다시 읽지 않고 기존 색인으로 type 연결만 갱신')
+    args = parser.parse_args()
+
+    if args.links_only:
+        index = GuidelineIndex.load(args.index_dir)
+        if index is None:
+            parser.error(f"{args.index_dir}에 색인이 없습니다. 먼저 --links-only 없이 색인을 빌드하세요.")
+    else:
+        index = build_index(args.guideline_dir, args.index_dir)
+    types = args.types if args.types is not None else load_result_types()
+    build_type_links(index, types, args.index_dir)
+    print(f"섹션 {len(index.chunks)}개, 용어 {len(index.terms)}개, type 연결 {len(types)}개 저장 완료")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import json
+import math
+import os
+
+SKETCH_FILE = 'Downloadfile/metrics_sketch.json'
+METRICS = ['latency', 'ttft', 'prompt_tokens', 'completion_tokens']
+QUANTILES = [0.5, 0.95, 0.99]
+
+
+class DDSketch:
+    # 상대 오차(relative_accuracy)가 보장되는 스트리밍 분위수 스케치
+    # 값들을 로그 스케일 버킷에 세기만 하므로 메모리는 값의 범위에만 비례하고,
+    # 같은 정확도의 스케치끼리는 버킷 카운트를 더하는 것만으로 병합된다.
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value is None or value < 0:
+            return
+        if value == 0:
+            self.zero_count += 1
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("relative_accuracy가 다른 스케치는 병합할 수 없습니다.")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                # 버킷 대표값이 실제 관측 범위를 벗어나지 않도록 보정
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(index): count for index, count in self.bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        return sketch
+
+
+class MetricsStore:
+    # (target, type, run_id) 별로 지표마다 DDSketch 하나씩 유지
+    def __init__(self):
+        self.sketches = {}
+
+    def record(self, target, jb_type, run_id, **values):
+        key = (target, jb_type, run_id)
+        if key not in self.sketches:
+            self.sketches[key] = {metric: DDSketch() for metric in METRICS}
+        for metric, value in values.items():
+            if metric in METRICS:
+                self.sketches[key][metric].add(value)
+
+    def merge(self, other):
+        for key, sketches in other.sketches.items():
+            if key not in self.sketches:
+                self.sketches[key] = {metric: DDSketch() for metric in METRICS}
+            for metric, sketch in sketches.items():
+                self.sketches[key][metric].merge(sketch)
+        return self
+
+    def summary(self, group_by=('target', 'type'), metrics=METRICS, quantiles=QUANTILES):
+        # 원본 행을 다시 읽지 않고 스케치 병합만으로 그룹별 분위수를 계산
+        fields = ('target', 'type', 'run_id')
+        groups = {}
+        for key, sketches in self.sketches.items():
+            labels = dict(zip(fields, key))
+            group = tuple(labels[field] for field in group_by)
+            merged = groups.setdefault(group, {metric: DDSketch() for metric in METRICS})
+            for metric in metrics:
+                merged[metric].merge(sketches[metric])
+
+        rows = []
+        for group, sketches in sorted(groups.items()):
+            row = dict(zip(group_by, group))
+            for metric in metrics:
+                sketch = sketches[metric]
+                for q in quantiles:
+                    row[f"{metric}_p{int(q * 100)}"] = sketch.quantile(q)
+                row[f"{metric}_sum"] = sketch.sum
+            # 배치 실행처럼 지연시간이 없는 경우도 있으므로 가장 많이 기록된 지표 기준
+            row['count'] = max(sketches[metric].count for metric in metrics)
+            rows.append(row)
+        return rows
+
+    def save(self, filename=SKETCH_FILE):
+        entries = [
+            {
+                'target': target,
+                'type': jb_type,
+                'run_id': run_id,
+                'sketches': {metric: sketch.to_dict() for metric, sketch in sketches.items()},
+            }
+            for (target, jb_type, run_id), sketches in self.sketches.items()
+        ]
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename=SKETCH_FILE):
+        store = cls()
+        if not os.path.exists(filename):
+            return store
+        with open(filename, encoding='utf-8') as f:
+            entries = json.load(f)
+        for entry in entries:
+            # 이전 형식은 모델 이름을 'model'에 저장했으며, 단일 타겟 실행의 타겟 이름 기본값과 같음
+            target = entry['target'] if 'target' in entry else entry['model']
+            key = (target, entry['type'], entry['run_id'])
+            store.sketches[key] = {
+                metric: DDSketch.from_dict(data) for metric, data in entry['sketches'].items()
+            }
+        return store
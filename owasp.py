@@ -1,5 +1,8 @@
 import streamlit as st
 
+from guideline_cache import load_guideline_index
+from guideline_index import INDEX_DIR
+
 class OWASPApp:
     def __init__(self):
         pass
@@ -71,6 +74,23 @@ class OWASPApp:
             </style>
         """, unsafe_allow_html=True)
 
+        # 가이드라인 본문 검색
+        col0, col123, col4 = st.columns([1, 10, 1])
+        with col123:
+            index = load_guideline_index(INDEX_DIR)
+            query = st.text_input("가이드라인 검색", placeholder="예: 프롬프트 주입, 개인정보 유출, data poisoning")
+            if query:
+                if index is None:
+                    st.warning("검색 색인이 없습니다. `python guideline_index.py` 로 색인을 먼저 생성하세요.")
+                else:
+                    hits = index.search(query)
+                    if not hits:
+                        st.warning("검색 결과가 없습니다.")
+                    for hit in hits:
+                        with st.expander(f"{hit['document']} · {hit['section'] or '본문'} (p.{hit['page']})"):
+                            st.caption(hit['text'])
+        st.markdown("<br>", unsafe_allow_html=True)
+
         # 참고자료 항목들
         references = [
              {
@@ -1,6 +1,9 @@
 import pandas as pd
 import streamlit as st
 
+from guideline_cache import load_guideline_index, load_type_sections
+from guideline_index import INDEX_DIR
+
 # 데이터 로드를 캐시 처리
 @st.cache_data
 def load_results(filename):
@@ -138,8 +141,8 @@ class PromptHistoryApp:
 
                 with st.container(border=True):
                     st.markdown("<div class='filter-label'>탈옥 성공 여부 선택</div>", unsafe_allow_html=True)
-                    success_options_display = ["전체", "Success", "Fail"]
-                    success_options_actual = ["전체", "success", "fail"]
+                    success_options_display = ["전체", "Success", "Fail", "Empty"]
+                    success_options_actual = ["전체", "success", "fail", "empty"]
                     # 선택한 값이 리스트에 있는지 확인 후, 없다면 기본값 설정
                     if st.session_state.selected_success not in success_options_actual:
                         st.session_state.selected_success = "전체"
@@ -147,6 +150,18 @@ class PromptHistoryApp:
                     st.session_state.selected_success = success_options_actual[success_options_display.index(selected_success_display)]
                     st.session_state.filtered_df = filter_data(st.session_state.results_df, st.session_state.selected_types, st.session_state.selected_success)
 
+                # 선택한 type과 연결된 가이드라인 섹션 (빌드 시 미리 계산된 매핑, 없으면 type별로 한 번만 검색)
+                index = load_guideline_index(INDEX_DIR)
+                if index is not None:
+                    st.markdown("<div class='container-spacing'></div>", unsafe_allow_html=True)
+                    with st.container(border=True):
+                        st.markdown("<div class='filter-label'>관련 가이드라인</div>", unsafe_allow_html=True)
+                        linked_types = [t for t in st.session_state.selected_types if t != "전체"] or type_options[1:]
+                        for jb_type in linked_types:
+                            for section in load_type_sections(INDEX_DIR, jb_type):
+                                with st.expander(f"[{jb_type}] {section['document']} · {section['section'] or '본문'} (p.{section['page']})"):
+                                    st.caption(section['text'])
+
             # 데이터 표시
             if st.session_state.filtered_df is not None:
                 if st.session_state.filtered_df.empty:
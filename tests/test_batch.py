@@ -0,0 +1,81 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from batch import ShardWriter, build_batch, ingest_batch, make_custom_id, parse_custom_id
+from evaluate import load_targets
+
+
+def read_lines(filename):
+    with open(filename, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_shard_writer_line_limit(tmp_path):
+    writer = ShardWriter(str(tmp_path), 'local', max_lines=2)
+    for i in range(5):
+        writer.write({'i': i})
+    writer.close()
+    assert [len(read_lines(filename)) for filename in writer.filenames] == [2, 2, 1]
+    assert [os.path.basename(filename) for filename in writer.filenames] == [
+        'local-00000.jsonl', 'local-00001.jsonl', 'local-00002.jsonl',
+    ]
+
+
+def test_shard_writer_byte_limit(tmp_path):
+    record = {'prompt': '가' * 10}
+    line_bytes = len((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+    writer = ShardWriter(str(tmp_path), 'local', max_bytes=line_bytes * 2 + 1)
+    for _ in range(5):
+        writer.write(record)
+    writer.close()
+    assert [os.path.getsize(filename) for filename in writer.filenames] == [line_bytes * 2, line_bytes * 2, line_bytes]
+
+
+def test_custom_id_round_trip():
+    for name, no in [('gpt-4o-mini', 1), ('team__gateway', 42), ('7', 0)]:
+        assert parse_custom_id(make_custom_id({'name': name}, no)) == (name, no)
+
+
+def write_prompts(tmp_path):
+    filename = tmp_path / 'prompts.csv'
+    filename.write_text('no,prompt,type\n1,a,역할극\n2,b,우회\n3,c,우회\n', encoding='utf-8')
+    return str(filename)
+
+
+def test_build_batch_removes_stale_shards(tmp_path):
+    prompts = write_prompts(tmp_path)
+    out_dir = tmp_path / 'batch'
+    target = {'name': 'b', 'model': 'gpt-4o-mini'}
+    other = {'name': 'b-x', 'model': 'gpt-4o-mini'}
+    build_batch([target, other], prompts, str(out_dir), max_lines=1)
+    shards = build_batch([target], prompts, str(out_dir))
+    assert sorted(os.listdir(out_dir)) == ['b-00000.jsonl', 'b-x-00000.jsonl', 'b-x-00001.jsonl', 'b-x-00002.jsonl']
+    assert len(read_lines(shards['b'][0])) == 3
+
+
+def test_load_targets_rejects_file_name_collisions(tmp_path):
+    filename = tmp_path / 'targets.json'
+    filename.write_text(json.dumps([{'name': 'b/x', 'model': 'm'}, {'name': 'b_x', 'model': 'm'}]), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_targets(str(filename))
+
+
+def test_ingest_is_idempotent_with_numeric_names(tmp_path):
+    prompts = write_prompts(tmp_path)
+    target = {'name': '7', 'model': 'gpt-4o-mini'}
+    output = tmp_path / 'output.jsonl'
+    with open(output, 'w', encoding='utf-8') as f:
+        for no in (1, 2, 3):
+            f.write(json.dumps({
+                'custom_id': make_custom_id(target, no),
+                'response': {'status_code': 200, 'body': {'choices': [{'message': {'content': '네'}}]}},
+            }) + '\n')
+    results = str(tmp_path / 'results.csv')
+    sketch = str(tmp_path / 'sketch.json')
+    kwargs = dict(prompts_file=prompts, run_id='2024', results_file=results, sketch_file=sketch)
+    assert ingest_batch([str(output)], [target], **kwargs) == (3, 0, 0)
+    assert ingest_batch([str(output)], [target], **kwargs) == (0, 3, 0)
+    assert len(pd.read_csv(results)) == 3
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from evaluate import EMPTY_OUTCOME, UNTYPED, append_rows, judge_response, load_prompts
+
+
+def test_judge_response():
+    assert judge_response('물론이죠, 방법은 다음과 같습니다.') == 'success'
+    assert judge_response('죄송하지만 도와드릴 수 없습니다.') == 'fail'
+    assert judge_response('') == EMPTY_OUTCOME
+    assert judge_response('   ') == EMPTY_OUTCOME
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_load_prompts_drops_empty_prompts_and_reads_types(tmp_path):
+    prompts = write_csv(tmp_path / 'prompts.csv', 'no,prompt\n1,a\n2,\n3,"  "\n4,b\n')
+    types = write_csv(tmp_path / 'types.csv', 'no,type\n1,역할극\n4,우회\n4,권한상승\n')
+    prompts_df = load_prompts(prompts, types)
+    assert list(prompts_df['no']) == [1, 4]
+    assert list(prompts_df['type']) == ['역할극', '권한상승']
+
+
+def test_load_prompts_without_types_fails_loudly(tmp_path):
+    prompts = write_csv(tmp_path / 'prompts.csv', 'no,prompt\n1,a\n')
+    types = write_csv(tmp_path / 'types.csv', 'no,type\n2,역할극\n')
+    with pytest.raises(ValueError):
+        load_prompts(prompts, types)
+    assert list(load_prompts(prompts, types, untyped=True)['type']) == [UNTYPED]
+
+
+def test_append_rows_follows_existing_header_order(tmp_path):
+    results = write_csv(tmp_path / 'results.csv', 'no,type,response\n1,역할극,a\n')
+    append_rows(results, [{'response': 'b', 'no': 2, 'type': '우회'}])
+    results_df = pd.read_csv(results)
+    assert list(results_df.columns) == ['no', 'type', 'response']
+    assert list(results_df['response']) == ['a', 'b']
+
+
+def test_append_rows_rewrites_with_union_of_columns(tmp_path):
+    results = write_csv(tmp_path / 'results.csv', 'no,type,response\n1,역할극,a\n')
+    append_rows(results, [{'no': 2, 'type': '우회', 'response': 'b', 'target': 'local'}])
+    append_rows(results, [{'no': 3, 'type': '우회', 'response': 'c', 'target': 'local'}])
+    results_df = pd.read_csv(results)
+    assert list(results_df.columns) == ['no', 'type', 'response', 'target']
+    assert list(results_df['no']) == [1, 2, 3]
+    assert results_df['target'].isna().tolist() == [True, False, False]
@@ -0,0 +1,65 @@
+from guideline_index import MAX_CHUNK_CHARS, split_sections, tokenize
+
+
+def sections_of(pages, document=''):
+    return [section['section'] for section in split_sections(pages, document)]
+
+
+def test_tokenize_uses_hangul_bigrams_and_latin_words():
+    assert tokenize('탈옥 공격') == ['탈옥', '공격']
+    assert tokenize('프롬프트') == ['프롬', '롬프', '프트']
+    assert tokenize('Prompt Injection, LLM01') == ['prompt', 'injection', 'llm01']
+
+
+def test_split_sections_numbered_headings():
+    pages = ['1 개요\n본문입니다.\n1.1 초거대 AI 시대 도래\n내용입니다.', '1.2. 추진 방향\n계속됩니다.']
+    sections = split_sections(pages)
+    assert [section['section'] for section in sections] == ['1 개요', '1.1 초거대 AI 시대 도래', '1.2. 추진 방향']
+    assert [section['page'] for section in sections] == [1, 1, 2]
+
+
+def test_split_sections_strips_glued_page_numbers():
+    pages = ['1 개요\n본문입니다.', '51.2디지털플랫폼정부 초거대 AI 추진 방향\n내용입니다.', '122. Secure development\n내용입니다.']
+    assert sections_of(pages) == ['1 개요', '1.2 디지털플랫폼정부 초거대 AI 추진 방향', '2. Secure development']
+
+
+def test_split_sections_rejects_captions_toc_and_page_numbers():
+    pages = [
+        '1 개요\n본문입니다.\n'
+        '4그림 1인공지능 종류와 초거대 AI 관계\n'
+        'Figure 2.2: Image of options\n'
+        '1.1. 초거대 AI 시대 도래·················2\n'
+        '1.1 초거대 AI 시대 도래2.1 초거대 AI와 초거대 언어\n'
+        '22지자체 주요 부서별 활용 예시\n'
+        '2.05 OPT Meta AI 1,750억 1,800억 공개\n'
+        '1 인공지능 기반 서비스는 정확한 정보를 보장할 수 없다.'
+    ]
+    assert sections_of(pages) == ['1 개요']
+
+
+def test_split_sections_cuts_running_headers_at_document_name():
+    document = '챗GPT 등 생성형 AI 활용 보안 가이드라인'
+    pages = [
+        f'3 {document}1.2. 생성형 인공지능 기술의 기본 개념\n본문입니다.',
+        f'19 Notes{document}\n각주입니다.',
+    ]
+    assert sections_of(pages, document) == ['1.2. 생성형 인공지능 기술의 기본 개념']
+
+
+def test_split_sections_unnumbered_headings():
+    pages = [
+        'Executive summary\nThis document recommends guidelines.\n'
+        'Why is AI security different?\nAI systems are subject to novel vulnerabilities.\n'
+        'Short wrapped line without period\nand it continues in lowercase.',
+        'Bo Li (University of Chicago)\nSong GUO (HKUST)\nHeather Frase (Georgetown University)',
+    ]
+    assert sections_of(pages) == ['Executive summary', 'Why is AI security different?', 'Bo Li (University of Chicago)']
+
+
+def test_split_sections_splits_long_sections():
+    line = '가' * 100
+    sections = split_sections(['1 개요\n' + '\n'.join([line] * 20), '\n'.join([line] * 20)])
+    assert all(section['section'] == '1 개요' for section in sections)
+    assert all(len(section['text']) <= MAX_CHUNK_CHARS for section in sections)
+    assert sum(section['text'].count(line) for section in sections) == 40
+    assert sections[-1]['page'] == 2
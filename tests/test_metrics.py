@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from metrics import DDSketch, MetricsStore
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+@pytest.mark.parametrize('values', [
+    [random.Random(0).expovariate(1) for _ in range(5000)],
+    [random.Random(1).lognormvariate(0, 2) for _ in range(5000)],
+    [random.Random(2).uniform(0.001, 1000) for _ in range(5000)],
+])
+def test_quantile_within_relative_accuracy(values):
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    for q in (0.5, 0.95, 0.99):
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= 0.01 * expected + 1e-12
+
+
+def test_merge_matches_single_sketch():
+    values = [random.Random(3).expovariate(0.5) for _ in range(2000)]
+    whole, left, right = DDSketch(), DDSketch(), DDSketch()
+    for value in values:
+        whole.add(value)
+    for value in values[:700]:
+        left.add(value)
+    for value in values[700:]:
+        right.add(value)
+    left.merge(right)
+    assert left.bins == whole.bins
+    assert (left.count, left.min, left.max) == (whole.count, whole.min, whole.max)
+    assert left.sum == pytest.approx(whole.sum)
+
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        DDSketch(0.01).merge(DDSketch(0.02))
+
+
+def test_zero_and_missing_values():
+    sketch = DDSketch()
+    for value in (0, 0, None, -1, 5):
+        sketch.add(value)
+    assert sketch.count == 3
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == 5
+    assert DDSketch().quantile(0.5) is None
+
+
+def test_store_roundtrip_and_summary(tmp_path):
+    store = MetricsStore()
+    store.record('a', 't1', 'r1', latency=1.0, prompt_tokens=10)
+    store.record('a', 't2', 'r2', latency=3.0, prompt_tokens=20)
+    store.record('b', 't1', 'r1', prompt_tokens=5)
+    filename = str(tmp_path / 'sketch.json')
+    store.save(filename)
+
+    loaded = MetricsStore.load(filename)
+    rows = {row['target']: row for row in loaded.summary(group_by=('target',))}
+    assert rows['a']['count'] == 2
+    assert rows['a']['prompt_tokens_sum'] == 30
+    # 지연시간이 없는 타겟(배치 결과)도 가장 많이 기록된 지표로 개수를 셈
+    assert rows['b']['count'] == 1
+    assert rows['b']['latency_p50'] is None
+
+
+def test_load_legacy_model_key(tmp_path):
+    filename = tmp_path / 'sketch.json'
+    filename.write_text(
+        '[{"model": "m", "type": "t", "run_id": "r", "sketches": {"latency": '
+        + '{"relative_accuracy": 0.01, "bins": {"0": 1}, "zero_count": 0, "count": 1, "sum": 1.0, "min": 1.0, "max": 1.0}}}]',
+        encoding='utf-8',
+    )
+    loaded = MetricsStore.load(str(filename))
+    assert list(loaded.sketches) == [('m', 't', 'r')]